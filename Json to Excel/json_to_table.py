@@ -1,75 +1,328 @@
-﻿import pandas as pd
+﻿import csv
 import json
 import re
+import string
+import sys
 import time
 from pathlib import Path
-from collections import defaultdict
 from datetime import datetime
+from itertools import chain
+
+try:
+    import orjson  # optional: only used when USE_ORJSON is on
+except ImportError:
+    orjson = None
+
+try:
+    import ijson  # optional: only needed for STREAM_MODE
+except ImportError:
+    ijson = None
 
 # ---------------------- CONFIGURATION ----------------------
 INPUT_FILE = r"C:\Users\SyedRehmanAli\Downloads\response.json"
+STREAM_MODE = False   # True: stream with ijson (needs ijson) instead of loading the whole file;
+                      # arrays at the same path then go into one CSV instead of one per index
+USE_ORJSON = False    # True: parse with orjson (if installed) — faster, but integers wider
+                      # than 64 bits come back as floats and lose precision
 # -----------------------------------------------------------
 
+def _intern_object(d):
+    """
+    json object_hook: share one str object per repeated short string value.
+    Keys are left alone: the json scanner already reuses one str per key within a document.
+    """
+    return {k: (sys.intern(v) if type(v) is str and len(v) < 32 else v) for k, v in d.items()}
+
+def load_json(json_path):
+    """Parse the whole file. Raises json.JSONDecodeError if it isn't valid JSON."""
+    raw = json_path.read_bytes()
+    if USE_ORJSON and orjson is not None:
+        try:
+            return orjson.loads(raw)
+        except orjson.JSONDecodeError:
+            pass  # e.g. NaN, 1e400, a UTF-8 BOM or very deep nesting: let json decide
+    # json.loads accepts UTF-8 bytes (with or without a BOM)
+    return json.loads(raw, object_hook=_intern_object)
+
+_ALLOWED_NAME_CHARS = set(string.ascii_letters + string.digits + "_.-")
+_SANITIZE_TABLE = {c: "_" for c in range(128) if chr(c) not in _ALLOWED_NAME_CHARS}
+_INVALID_NAME_CHARS = re.compile(r'[^A-Za-z0-9_.-]')
+
 def sanitize_name(name):
-    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(name))
+    name = str(name)
+    # translate() is a plain table lookup; the regex is only needed for non-ASCII names
+    if name.isascii():
+        return name.translate(_SANITIZE_TABLE)
+    return _INVALID_NAME_CHARS.sub('_', name)
 
-def uniquify(name, used_names):
-    base = name
-    i = 1
-    while name in used_names:
-        name = f"{base}_{i}"
+def uniquify(name, used_names, name_counters):
+    """
+    Return `name`, or `name_N` if it's taken. name_counters remembers the next suffix
+    per base name, so repeated collisions don't re-scan from _1 every time.
+    """
+    if name not in used_names:
+        used_names.add(name)
+        return name
+    i = name_counters.get(name, 1)
+    candidate = f"{name}_{i}"
+    while candidate in used_names:
         i += 1
-    used_names.add(name)
-    return name
+        candidate = f"{name}_{i}"
+    name_counters[name] = i + 1
+    used_names.add(candidate)
+    return candidate
 
 def is_array_of_dicts(value):
-    return isinstance(value, list) and all(isinstance(v, dict) for v in value)
+    # JSON parsers only ever return plain list/dict, so `type(x) is` is safe and skips the
+    # isinstance subclass check. Empty lists are skipped: they'd only produce blank CSVs.
+    # Checking value[0] first rejects most non-matching lists without the full scan.
+    return (type(value) is list and len(value) > 0 and type(value[0]) is dict
+            and all(type(v) is dict for v in value))
+
+def _check_aod(value, aod_cache, schema_cache):
+    """
+    is_array_of_dicts, memoized by id() so each list is only scanned once per run.
+    Arrays of dicts get their column schema cached at the same time (schema_cache[id]).
+    """
+    if type(value) is not list:
+        return False
+    key = id(value)
+    result = aod_cache.get(key)
+    if result is None:
+        result = aod_cache[key] = is_array_of_dicts(value)
+        if result:
+            schema_cache[key] = union_keys(value)
+    return result
 
 def union_keys(list_of_dicts):
-    keys = set()
-    for d in list_of_dicts[:500]:
-        keys.update(d.keys())
-    return keys
+    """Keys of all the dicts, in first-seen order."""
+    # dict.fromkeys keeps order and does the whole union in C
+    return tuple(dict.fromkeys(chain.from_iterable(list_of_dicts)))
 
-def traverse_and_collect(node, path, sheets, used_names, stats):
+# work-stack entry kinds for traverse_and_collect
+_DICT_KIDS = "DICT_KIDS"  # a dict whose items are part-way through being visited
+_LIST_KIDS = "LIST_KIDS"  # same for a plain list
+_AOD_ROWS = "AOD_ROWS"    # same for an array of dicts (every child is known to be a dict)
+
+def traverse_and_collect(node, path, sheets, used_names, name_counters, stats, aod_cache, schema_cache):
     """
-    Recursively traverse JSON and collect EVERY array-of-dicts as its own sheet.
-    IMPORTANT CHANGE: do NOT return after collecting; continue recursing to find nested arrays.
+    Traverse JSON and collect EVERY array-of-dicts as its own sheet.
+    No recursion at all: a single loop pops (kind, payload, path) tuples off a list, so
+    depth is only limited by memory (no sys.setrecursionlimit needed). Containers are
+    resumed through their item iterators, which keeps document order (and therefore
+    sheet naming) and means scalars never get a stack entry or a path string.
+    Each child is classified once, when its parent reaches it: an array of dicts gets its
+    sheet (and cached schema) right there and its rows are queued in the same step.
+    The caches must live as long as `node` (json.load never aliases objects, so id() is stable).
+    sheets maps each sheet name to (columns, rows): the schema worked out while classifying
+    the array, in first-seen order, plus the original list object (no copy).
     """
-    if is_array_of_dicts(node):
-        # give the root a real name so the CSV isn't blank
-        sheet_name = sanitize_name(path or "root")
-        sheet_name = uniquify(sheet_name, used_names)
-        sheets[sheet_name].extend(node)
-        stats['arrays_found'] += 1
-        # <-- removed the early 'return' so we still descend into children
-
-    if isinstance(node, dict):
-        for k, v in node.items():
-            new_path = f"{path}.{k}" if path else k
-            traverse_and_collect(v, new_path, sheets, used_names, stats)
-
-    elif isinstance(node, list):
-        for i, item in enumerate(node):
-            # keep a precise path so child sheets get sensible names, e.g. "Data.Result"
-            new_path = f"{path}[{i}]" if path else f"[{i}]"
-            traverse_and_collect(item, new_path, sheets, used_names, stats)
-
-def rows_to_dataframe(rows):
-    """Convert list of dicts to DataFrame, flattening nested dicts (deep)."""
-    df = pd.DataFrame(rows)
-    if not df.empty:
-        changed = True
-        # keep expanding dict columns until none left
-        while changed:
-            changed = False
-            for col in list(df.columns):
-                if df[col].apply(lambda x: isinstance(x, dict)).any():
-                    expanded = pd.json_normalize(df[col])
-                    expanded.columns = [f"{col}.{sub}" for sub in expanded.columns]
-                    df = pd.concat([df.drop(columns=[col]), expanded], axis=1)
-                    changed = True
-    return df
+    stack = []
+
+    def push(value, path):
+        if _check_aod(value, aod_cache, schema_cache):
+            # give the root a real name so the CSV isn't blank
+            sheet_name = sanitize_name(path or "root")
+            sheet_name = uniquify(sheet_name, used_names, name_counters)
+            sheets[sheet_name] = (schema_cache[id(value)], value)
+            stats['arrays_found'] += 1
+            # still descend into the rows to find nested arrays
+            stack.append((_AOD_ROWS, enumerate(value), path))
+        elif type(value) is dict:
+            stack.append((_DICT_KIDS, iter(value.items()), path))
+        elif type(value) is list:
+            stack.append((_LIST_KIDS, enumerate(value), path))
+
+    push(node, path)
+    while stack:
+        kind, payload, path = stack.pop()
+
+        if kind is _AOD_ROWS:
+            for i, row in payload:
+                stack.append((kind, payload, path))
+                # keep a precise path so child sheets get sensible names, e.g. "Data.Result"
+                stack.append((_DICT_KIDS, iter(row.items()), f"{path}[{i}]" if path else f"[{i}]"))
+                break
+            continue
+
+        # DICT_KIDS / LIST_KIDS: descend into the next container child, skipping scalars
+        for key, child in payload:
+            if type(child) is dict or type(child) is list:
+                stack.append((kind, payload, path))
+                if kind is _DICT_KIDS:
+                    push(child, f"{path}.{key}" if path else key)
+                else:
+                    push(child, f"{path}[{key}]" if path else f"[{key}]")
+                break
+
+def has_nested_dicts(rows):
+    """True if any row has a dict value, i.e. needs flattening before it can be written."""
+    return any(isinstance(v, dict) for r in rows for v in r.values())
+
+def flatten_row(row, sep="."):
+    """
+    Flatten nested dicts of one row into dotted keys (e.g. "y.z"); lists are kept as-is.
+    Each dict is resumed through its item iterator, so columns come out in document order
+    (the same order discover_stream_schema records them in).
+    """
+    out = {}
+    stack = [("", iter(row.items()))]
+    while stack:
+        prefix, items = stack[-1]
+        for k, v in items:
+            key = f"{prefix}{k}"
+            if isinstance(v, dict):
+                stack.append((f"{key}{sep}", iter(v.items())))
+                break
+            out[key] = v
+        else:
+            stack.pop()
+    return out
+
+def flattened_parents(columns, sep="."):
+    """Columns that are also the dotted prefix of another column, e.g. "addr" next to "addr.city"."""
+    present = set(columns)
+    parents = set()
+    for c in columns:
+        parts = c.split(sep)
+        for i in range(1, len(parts)):
+            prefix = sep.join(parts[:i])
+            if prefix in present:
+                parents.add(prefix)
+    return parents
+
+def write_sheet(csv_path, rows, fieldnames):
+    """Write one sheet to CSV and return (rows, columns)."""
+    if has_nested_dicts(rows):
+        # flatten first, then take the schema from the flattened rows
+        rows = [flatten_row(r) for r in rows]
+        fieldnames = union_keys(rows)
+        # a key that's null in some rows and an object in others would leave a bare, always
+        # empty parent column (e.g. "addr" next to "addr.city"); drop it, as json_normalize did
+        empty = {c for c in flattened_parents(fieldnames) if all(r.get(c) is None for r in rows)}
+        if empty:
+            fieldnames = tuple(c for c in fieldnames if c not in empty)
+
+    # one csv.writer path for every sheet, so numbers are formatted the same everywhere
+    with open(csv_path, 'w', newline='', encoding='utf-8-sig') as f:
+        writer = csv.writer(f)
+        writer.writerow(fieldnames)
+        writer.writerows([r.get(c, '') for c in fieldnames] for r in rows)
+    return len(rows), len(fieldnames)
+
+def discover_stream_schema(json_path):
+    """
+    Streaming pass 1: walk the ijson event stream and find every prefix that holds
+    arrays of objects, plus the flattened columns of their rows (in first-seen order).
+    Only the current container path is kept in memory.
+    Note: ijson prefixes collapse list indices to "item", so e.g. every Data[i].Result
+    lands under the single prefix "Data.item.Result" (one sheet instead of one per index).
+    A prefix is only kept if every array under it holds objects only; if any of them holds
+    a non-object, the whole prefix is skipped and none of its arrays are counted.
+    Returns ([(prefix, columns, dropped)], arrays_found); `dropped` are parent columns that
+    were only ever null (e.g. "addr" next to "addr.city"), left out just like write_sheet does.
+    """
+    columns = {}     # array prefix -> {column: None}, used as an ordered set
+    all_dicts = {}   # array prefix -> False once any occurrence holds a non-object
+    row_count = {}   # array prefix -> number of items seen across occurrences
+    found = {}       # array prefix -> number of non-empty arrays-of-objects under it
+    filled = {}      # array prefix -> columns that held a non-null value in some row
+    # frames: ['map', key_prefix, owner, key] or ['array', prefix, only_dicts, n_items]
+    # key_prefix is built exactly like flatten_row's: "" for the row root, "a." for a nested
+    # object under key "a", None when the map isn't inside a row
+    stack = []
+
+    with open(json_path, 'rb') as f:
+        for prefix, event, value in ijson.parse(f, use_float=True):
+            if event == 'map_key':
+                stack[-1][3] = value
+                continue
+            if event in ('end_map', 'end_array'):
+                frame = stack.pop()
+                if event == 'end_array':
+                    _, arr_prefix, only_dicts, n = frame
+                    all_dicts[arr_prefix] = all_dicts.get(arr_prefix, True) and only_dicts
+                    row_count[arr_prefix] = row_count.get(arr_prefix, 0) + n
+                    if only_dicts and n:
+                        found[arr_prefix] = found.get(arr_prefix, 0) + 1
+                continue
+
+            # any other event starts a value: classify it against its parent container
+            key_prefix, owner = None, None
+            parent = stack[-1] if stack else None
+            if parent is not None and parent[0] == 'array':
+                parent[3] += 1
+                if event != 'start_map':
+                    parent[2] = False
+                key_prefix, owner = "", parent[1]   # a map here is a row of that array
+            elif parent is not None and parent[1] is not None:
+                col = f"{parent[1]}{parent[3]}"
+                owner = parent[2]
+                if event == 'start_map':            # nested maps are flattened, not columns
+                    key_prefix = f"{col}."
+                else:
+                    columns[owner][col] = None
+                    if event != 'null':
+                        filled.setdefault(owner, set()).add(col)
+
+            if event == 'start_map':
+                stack.append(['map', key_prefix, owner, None])
+            elif event == 'start_array':
+                columns.setdefault(prefix, {})      # registered on entry to keep document order
+                stack.append(['array', prefix, True, 0])
+
+    schema = []
+    for p, cols in columns.items():
+        if all_dicts.get(p) and row_count.get(p):
+            dropped = flattened_parents(cols) - filled.get(p, set())
+            schema.append((p, [c for c in cols if c not in dropped], dropped))
+    arrays_found = sum(found[p] for p, _, _ in schema)
+    return schema, arrays_found
+
+def stream_to_csv(json_path, output_dir, output_prefix):
+    """
+    Streaming pass 2: for each discovered prefix, re-read the file with ijson.items and
+    write rows to its CSV as they arrive. Peak memory is one row, not the whole file.
+    Returns (sheets_created, arrays_found, total_rows).
+    """
+    schema, arrays_found = discover_stream_schema(json_path)
+    used_names = set()
+    name_counters = {}
+    total_rows = 0
+
+    for prefix, cols, dropped in schema:
+        sheet_name = uniquify(sanitize_name(prefix or "root"), used_names, name_counters)
+        csv_path = output_dir / f"{output_prefix}_{sheet_name}.csv"
+        items_prefix = f"{prefix}.item" if prefix else "item"
+        n_rows = 0
+        with open(json_path, 'rb') as f, open(csv_path, 'w', newline='', encoding='utf-8-sig') as out:
+            # no extrasaction='ignore': discovery saw every row, so an unknown key is a bug
+            writer = csv.DictWriter(out, fieldnames=cols)
+            writer.writeheader()
+            for row in ijson.items(f, items_prefix, use_float=True):
+                flat = flatten_row(row)
+                for c in dropped:
+                    flat.pop(c, None)   # only ever null, see discover_stream_schema
+                writer.writerow(flat)
+                n_rows += 1
+        print(f"📄 Saved: {csv_path.name} ({n_rows} rows, {len(cols)} columns)")
+        total_rows += n_rows
+
+    return len(schema), arrays_found, total_rows
+
+def print_summary(start_time, sheet_count, arrays_found, total_rows, output_dir):
+    end_time = datetime.now()
+    duration = (end_time - start_time).total_seconds()
+
+    print("\n📊 --- SUMMARY ---")
+    print(f"📁 Total sheets created: {sheet_count}")
+    print(f"📦 Total arrays found: {arrays_found}")
+    print(f"🧾 Total rows processed: {total_rows}")
+    print(f"💾 Files saved in: {output_dir}")
+    print(f"🕒 Start: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"🕒 End:   {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
+    print(f"⏱️ Duration: {duration:.2f} seconds")
+    print("\n✅ Conversion completed successfully.")
 
 def main():
     start_time = datetime.now()
@@ -82,27 +335,46 @@ def main():
         print(f"❌ Error: File not found → {input_path}")
         return
 
-    # Load JSON
-    with open(input_path, 'r', encoding='utf-8') as f:
+    # Prepare output
+    timestamp = time.strftime("%Y%m%d_%H%M%S")
+    output_prefix = f"{input_path.stem}_{timestamp}"
+    output_dir = input_path.parent
+
+    # Streaming: never hold the whole file in memory
+    if STREAM_MODE:
+        if ijson is None:
+            print("❌ STREAM_MODE needs ijson: python -m pip install --user ijson")
+            return
+        print("🌊 Streaming with ijson.\n")
         try:
-            data = json.load(f)
-            print("✅ JSON file loaded successfully.\n")
-        except json.JSONDecodeError as e:
+            sheet_count, arrays_found, total_rows = stream_to_csv(input_path, output_dir, output_prefix)
+        except ijson.JSONError as e:
             print(f"❌ Failed to parse JSON: {e}")
             return
+        if not sheet_count:
+            print("⚠️ No arrays of objects found in the JSON file.")
+            return
+        print_summary(start_time, sheet_count, arrays_found, total_rows, output_dir)
+        return
+
+    # Load JSON
+    try:
+        data = load_json(input_path)
+        print("✅ JSON file loaded successfully.\n")
+    except json.JSONDecodeError as e:
+        print(f"❌ Failed to parse JSON: {e}")
+        return
 
     # Initialize
-    sheets = defaultdict(list)
+    sheets = {}
     used_names = set()
+    name_counters = {}
     stats = {'arrays_found': 0}
+    aod_cache = {}
+    schema_cache = {}
 
     # Traverse JSON (now also captures nested arrays like Data.Result)
-    traverse_and_collect(data, "", sheets, used_names, stats)
-
-    # Prepare output
-    timestamp = time.strftime("%Y%m%d_%H%M%S")
-    output_prefix = f"{input_path.stem}_{timestamp}"
-    output_dir = input_path.parent
+    traverse_and_collect(data, "", sheets, used_names, name_counters, stats, aod_cache, schema_cache)
 
     if not sheets:
         print("⚠️ No arrays of objects found in the JSON file.")
@@ -110,25 +382,13 @@ def main():
 
     # Write CSVs
     total_rows = 0
-    for sheet_name, rows in sheets.items():
-        df = rows_to_dataframe(rows)
+    for sheet_name, (columns, rows) in sheets.items():
         csv_path = output_dir / f"{output_prefix}_{sanitize_name(sheet_name)}.csv"
-        df.to_csv(csv_path, index=False, encoding='utf-8-sig')
-        print(f"📄 Saved: {csv_path.name} ({len(df)} rows, {df.shape[1]} columns)")
-        total_rows += len(df)
+        n_rows, n_cols = write_sheet(csv_path, rows, columns)
+        print(f"📄 Saved: {csv_path.name} ({n_rows} rows, {n_cols} columns)")
+        total_rows += n_rows
 
-    end_time = datetime.now()
-    duration = (end_time - start_time).total_seconds()
-
-    print("\n📊 --- SUMMARY ---")
-    print(f"📁 Total sheets created: {len(sheets)}")
-    print(f"📦 Total arrays found: {stats['arrays_found']}")
-    print(f"🧾 Total rows processed: {total_rows}")
-    print(f"💾 Files saved in: {output_dir}")
-    print(f"🕒 Start: {start_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"🕒 End:   {end_time.strftime('%Y-%m-%d %H:%M:%S')}")
-    print(f"⏱️ Duration: {duration:.2f} seconds")
-    print("\n✅ Conversion completed successfully.")
+    print_summary(start_time, len(sheets), stats['arrays_found'], total_rows, output_dir)
 
 if __name__ == "__main__":
     main()